@@ -0,0 +1,30 @@
+#!/usr/bin/env python3
+"""
+Shared helper for setting GitHub Actions step outputs.
+"""
+
+import os
+
+def write_all(fd, data):
+    """Write all bytes to a file descriptor, retrying partial writes"""
+    view = memoryview(data)
+    while view:
+        written = os.write(fd, view)
+        view = view[written:]
+
+def set_github_output(name, value):
+    """Set GitHub Actions output with a single append write"""
+    github_output = os.environ.get('GITHUB_OUTPUT')
+    if not github_output:
+        print(f"Warning: GITHUB_OUTPUT not set, would set {name}")
+        return
+    
+    delimiter = f"{name.upper()}_EOF_DELIMITER"
+    data = f"{name}<<{delimiter}\n{value}\n{delimiter}\n".encode('utf-8')
+    
+    # O_APPEND makes the single write atomic with respect to other writers
+    fd = os.open(github_output, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+    try:
+        write_all(fd, data)
+    finally:
+        os.close(fd)
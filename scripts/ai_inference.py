@@ -4,14 +4,43 @@ Custom AI inference script supporting multiple providers.
 Supports OpenAI, Anthropic, and other OpenAI-compatible APIs.
 """
 
+import asyncio
+import hashlib
 import json
 import os
 import sys
-import requests
-from typing import Optional, Dict, Any
+import tempfile
+from functools import lru_cache
+from _gh_output import set_github_output
+from truncate_content import is_unreachable_content
+from tenacity import retry, retry_if_exception, stop_after_attempt, wait_exponential, wait_random
+from typing import Optional, Dict, Any, List
 
+SUPPORTED_PROVIDERS = ('openai', 'anthropic', 'custom')
+OPENAI_BASE_URL = 'https://api.openai.com/v1'
+RETRYABLE_STATUS_CODES = (429, 500, 502, 503, 504)
+MAX_RETRY_WAIT = 30
+
+# Response for the fallback content written by truncate_content.py when the page could not be crawled,
+# by SUMMARY_LANGUAGE
+UNREACHABLE_RESPONSES = {
+    'en': 'Unable to summarize: the URL was not reachable.',
+    'cn': '无法生成摘要：该网址无法访问。',
+}
+
+# Batched calls marshal at most this many prompts into one request, fewer if
+# their combined AI_BATCH_ITEM_TOKENS budget would exceed AI_MAX_OUTPUT_TOKENS
+MAX_BATCH_SIZE = 8
+BATCH_TOKEN_OVERHEAD = 200
+
+def create_client():
+    """Create an HTTP/2 client shared by the API calls of one event loop, importing httpx only when needed"""
+    import httpx
+    return httpx.AsyncClient(http2=True, timeout=60.0, headers={'Content-Type': 'application/json'})
+
+@lru_cache(maxsize=8)
 def load_system_prompt(file_path: str) -> str:
-    """Load system prompt from file"""
+    """Load system prompt from file, reading each file once per process"""
     try:
         with open(file_path, 'r', encoding='utf-8') as f:
             return f.read().strip()
@@ -33,12 +62,108 @@ def load_user_prompt() -> str:
         print(f"Error reading prompt: {e}")
         return ""
 
-def call_openai_api(api_key: str, base_url: str, model: str, system_prompt: str, user_prompt: str, max_tokens: int) -> Optional[str]:
+def load_user_prompts(file_path: str) -> List[str]:
+    """Load a list of user prompts from a JSON array file"""
+    try:
+        with open(file_path, 'r', encoding='utf-8') as f:
+            prompts = json.load(f)
+    except Exception as e:
+        print(f"Error loading user prompts: {e}")
+        return []
+    
+    if not isinstance(prompts, list):
+        print("Error: User prompts file must contain a JSON array")
+        return []
+    
+    return [str(prompt).strip() for prompt in prompts]
+
+def get_cache_path(model: str, system_prompt: str, user_prompt: str, max_tokens: int) -> Optional[str]:
+    """Get response cache file path, or None if caching is disabled"""
+    cache_dir = os.environ.get('AI_CACHE_DIR', '')
+    if not cache_dir:
+        return None
+    
+    key_data = {'m': model, 's': system_prompt, 'u': user_prompt, 't': max_tokens}
+    cache_key = hashlib.sha256(json.dumps(key_data, sort_keys=True).encode('utf-8')).hexdigest()
+    return os.path.join(os.path.expanduser(cache_dir), f"{cache_key}.json")
+
+def load_cached_response(cache_path: Optional[str]) -> Optional[str]:
+    """Load cached API response content if present"""
+    if not cache_path:
+        return None
+    
+    try:
+        with open(cache_path, 'r', encoding='utf-8') as f:
+            content = json.load(f).get('content')
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        print(f"Warning: Error reading response cache: {e}")
+        return None
+    
+    if content:
+        print(f"Using cached response: {cache_path}")
+    return content
+
+def save_cached_response(cache_path: Optional[str], content: str):
+    """Atomically write API response content to the cache"""
+    if not cache_path:
+        return
+    
+    try:
+        cache_dir = os.path.dirname(cache_path)
+        os.makedirs(cache_dir, exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=cache_dir, suffix='.tmp')
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump({'content': content}, f, ensure_ascii=False)
+        os.replace(temp_path, cache_path)
+    except Exception as e:
+        print(f"Warning: Error writing response cache: {e}")
+
+def is_retryable_error(error: BaseException) -> bool:
+    """Check whether a failed API request should be retried"""
+    import httpx
+    if isinstance(error, httpx.HTTPStatusError):
+        return error.response.status_code in RETRYABLE_STATUS_CODES
+    return isinstance(error, httpx.TransportError)
+
+_backoff_wait = wait_exponential(multiplier=2, min=2, max=MAX_RETRY_WAIT) + wait_random(0, 1)
+
+def retry_wait(retry_state) -> float:
+    """Honor Retry-After if the server sent one, otherwise back off exponentially with jitter"""
+    import httpx
+    error = retry_state.outcome.exception()
+    if isinstance(error, httpx.HTTPStatusError):
+        try:
+            return min(float(error.response.headers.get('Retry-After', '')), MAX_RETRY_WAIT)
+        except ValueError:
+            pass
+    return _backoff_wait(retry_state)
+
+def log_retry(retry_state):
+    """Log a retry before sleeping"""
+    error = retry_state.outcome.exception()
+    print(f"Attempt {retry_state.attempt_number} failed: {error}, retrying in {retry_state.next_action.sleep:.1f}s")
+
+@retry(stop=stop_after_attempt(3), wait=retry_wait, retry=retry_if_exception(is_retryable_error), before_sleep=log_retry, reraise=True)
+async def post_json(client, url: str, data: Dict[str, Any], headers: Dict[str, str]) -> Dict[str, Any]:
+    """POST a JSON request, retrying transient failures"""
+    response = await client.post(url, json=data, headers=headers)
+    response.raise_for_status()
+    return response.json()
+
+async def call_openai_api(client, api_key: str, base_url: str, model: str, system_prompt: str, user_prompt: str, max_tokens: int) -> Optional[str]:
     """Call OpenAI-compatible API"""
     
+    cache_path = get_cache_path(model, system_prompt, user_prompt, max_tokens)
+    cached = load_cached_response(cache_path)
+    if cached:
+        return cached
+    
+    import httpx
+    
     headers = {
-        'Authorization': f'Bearer {api_key}',
-        'Content-Type': 'application/json'
+        'Authorization': f'Bearer {api_key}'
     }
     
     data = {
@@ -51,35 +176,44 @@ def call_openai_api(api_key: str, base_url: str, model: str, system_prompt: str,
         'temperature': 0.7
     }
     
+    # Route requests sharing the system prompt to the same prefix cache (OpenAI only,
+    # other compatible APIs may reject unknown parameters)
+    if base_url.rstrip('/') == OPENAI_BASE_URL:
+        data['prompt_cache_key'] = hashlib.md5(system_prompt.encode('utf-8')).hexdigest()[:16]
+    
     try:
-        response = requests.post(f"{base_url}/chat/completions", 
-                               headers=headers, 
-                               json=data, 
-                               timeout=60)
-        response.raise_for_status()
-        
-        result = response.json()
-        return result['choices'][0]['message']['content']
+        result = await post_json(client, f"{base_url}/chat/completions", data, headers)
+        content = result['choices'][0]['message']['content']
+        save_cached_response(cache_path, content)
+        return content
         
-    except requests.exceptions.RequestException as e:
+    except httpx.HTTPError as e:
         print(f"API request failed: {e}")
         return None
-    except (KeyError, IndexError) as e:
+    except (KeyError, IndexError, ValueError) as e:
         print(f"Unexpected API response format: {e}")
         return None
 
-def call_anthropic_api(api_key: str, model: str, system_prompt: str, user_prompt: str, max_tokens: int) -> Optional[str]:
+async def call_anthropic_api(client, api_key: str, model: str, system_prompt: str, user_prompt: str, max_tokens: int) -> Optional[str]:
     """Call Anthropic API"""
     
+    cache_path = get_cache_path(model, system_prompt, user_prompt, max_tokens)
+    cached = load_cached_response(cache_path)
+    if cached:
+        return cached
+    
+    import httpx
+    
     headers = {
         'x-api-key': api_key,
-        'Content-Type': 'application/json',
         'anthropic-version': '2023-06-01'
     }
     
     data = {
         'model': model,
-        'system': system_prompt,
+        'system': [
+            {'type': 'text', 'text': system_prompt, 'cache_control': {'type': 'ephemeral'}}
+        ],
         'messages': [
             {'role': 'user', 'content': user_prompt}
         ],
@@ -87,34 +221,101 @@ def call_anthropic_api(api_key: str, model: str, system_prompt: str, user_prompt
     }
     
     try:
-        response = requests.post('https://api.anthropic.com/v1/messages', 
-                               headers=headers, 
-                               json=data, 
-                               timeout=60)
-        response.raise_for_status()
-        
-        result = response.json()
-        return result['content'][0]['text']
+        result = await post_json(client, 'https://api.anthropic.com/v1/messages', data, headers)
+        content = result['content'][0]['text']
+        save_cached_response(cache_path, content)
+        return content
         
-    except requests.exceptions.RequestException as e:
+    except httpx.HTTPError as e:
         print(f"Anthropic API request failed: {e}")
         return None
-    except (KeyError, IndexError) as e:
+    except (KeyError, IndexError, ValueError) as e:
         print(f"Unexpected Anthropic API response format: {e}")
         return None
 
-def set_github_output(name: str, value: str):
-    """Set GitHub Actions output"""
-    github_output = os.environ.get('GITHUB_OUTPUT')
-    if not github_output:
-        print(f"Warning: GITHUB_OUTPUT not set, would set {name}")
-        return
+async def call_ai_api(client, provider: str, api_key: str, base_url: str, model: str, system_prompt: str, user_prompt: str, max_tokens: int) -> Optional[str]:
+    """Call the API of the configured provider"""
+    if provider == 'anthropic':
+        return await call_anthropic_api(client, api_key, model, system_prompt, user_prompt, max_tokens)
+    return await call_openai_api(client, api_key, base_url, model, system_prompt, user_prompt, max_tokens)
+
+async def run_single(provider: str, api_key: str, base_url: str, model: str, system_prompt: str, user_prompt: str, max_tokens: int) -> Optional[str]:
+    """Run inference for one user prompt with a client bound to the running event loop"""
+    async with create_client() as client:
+        return await call_ai_api(client, provider, api_key, base_url, model, system_prompt, user_prompt, max_tokens)
+
+def get_unreachable_response() -> str:
+    """Get the canned response for an unreachable URL in the summary language"""
+    language = os.environ.get('SUMMARY_LANGUAGE', 'en').lower()
+    return UNREACHABLE_RESPONSES.get(language, UNREACHABLE_RESPONSES['en'])
+
+def build_batch_prompt(user_prompts: List[str]) -> str:
+    """Marshal multiple user prompts into a single enumerated prompt"""
+    items = "\n".join(f"{index}. {user_prompt}" for index, user_prompt in enumerate(user_prompts, 1))
+    count = len(user_prompts)
+    return f"Process these {count} bookmarks and reply with only a JSON array of {count} strings, one response per bookmark in the same order:\n{items}"
+
+def parse_batch_response(response: str, count: int) -> Optional[List[str]]:
+    """Parse a JSON array of response strings from a batched call"""
+    text = response.strip()
+    
+    # Models often wrap JSON in a markdown code fence
+    if text.startswith('```') and text.endswith('```'):
+        text = text[text.find('\n') + 1:-3].strip()
+    
+    try:
+        items = json.loads(text)
+    except ValueError:
+        return None
+    
+    if not isinstance(items, list) or len(items) != count:
+        return None
+    if not all(isinstance(item, str) for item in items):
+        return None
+    return [item.strip() for item in items]
+
+def get_batch_size(item_tokens: int, max_output_tokens: int) -> int:
+    """Get how many prompts fit in one batched call under the output token ceiling"""
+    return max(1, min(MAX_BATCH_SIZE, (max_output_tokens - BATCH_TOKEN_OVERHEAD) // item_tokens))
+
+async def main_async(provider: str, api_key: str, base_url: str, model: str, system_prompt: str, user_prompts: List[str], max_tokens: int, item_tokens: int, max_output_tokens: int, max_concurrency: int) -> List[Optional[str]]:
+    """Run inference for multiple user prompts, batching as many prompts per call as fit under max_output_tokens"""
+    semaphore = asyncio.Semaphore(max_concurrency)
+    client = create_client()
+    
+    async def run_one(user_prompt: str) -> Optional[str]:
+        async with semaphore:
+            return await call_ai_api(client, provider, api_key, base_url, model, system_prompt, user_prompt, max_tokens)
+    
+    async def run_batch(batch: List[str]) -> List[Optional[str]]:
+        if len(batch) == 1:
+            return [await run_one(batch[0])]
+        
+        batch_max_tokens = min(item_tokens * len(batch) + BATCH_TOKEN_OVERHEAD, max_output_tokens)
+        async with semaphore:
+            response = await call_ai_api(client, provider, api_key, base_url, model, system_prompt, build_batch_prompt(batch), batch_max_tokens)
+        
+        responses = parse_batch_response(response, len(batch)) if response else None
+        if responses is None:
+            print(f"Warning: Could not parse batched response for {len(batch)} prompts, falling back to one call per prompt")
+            return await asyncio.gather(*(run_one(user_prompt) for user_prompt in batch))
+        return responses
+    
+    # Answer prompts that only carry the crawl fallback message without calling the API
+    results = [get_unreachable_response() if is_unreachable_content(user_prompt) else None for user_prompt in user_prompts]
+    pending = [index for index, result in enumerate(results) if result is None]
+    if len(pending) < len(user_prompts):
+        print(f"Skipping AI inference for {len(user_prompts) - len(pending)} prompts with unreachable URLs")
     
-    delimiter = f"{name.upper()}_EOF_DELIMITER"
-    with open(github_output, 'a', encoding='utf-8') as f:
-        f.write(f"{name}<<{delimiter}\n")
-        f.write(value)
-        f.write(f"\n{delimiter}\n")
+    pending_prompts = [user_prompts[index] for index in pending]
+    batch_size = get_batch_size(item_tokens, max_output_tokens)
+    batches = [pending_prompts[i:i + batch_size] for i in range(0, len(pending_prompts), batch_size)]
+    async with client:
+        batch_responses = await asyncio.gather(*(run_batch(batch) for batch in batches))
+    
+    for index, response in zip(pending, (response for responses in batch_responses for response in responses)):
+        results[index] = response
+    return results
 
 def main():
     """Main execution function"""
@@ -122,10 +323,14 @@ def main():
     # Get configuration from environment
     provider = os.environ.get('AI_PROVIDER', 'openai').lower()
     api_key = os.environ.get('AI_API_KEY', '')
-    base_url = os.environ.get('AI_BASE_URL', 'https://api.openai.com/v1')
+    base_url = os.environ.get('AI_BASE_URL', OPENAI_BASE_URL)
     model = os.environ.get('AI_MODEL', 'gpt-3.5-turbo')
     max_tokens = int(os.environ.get('AI_MAX_TOKENS', '2000'))
+    max_output_tokens = int(os.environ.get('AI_MAX_OUTPUT_TOKENS', '4096'))
+    item_tokens = int(os.environ.get('AI_BATCH_ITEM_TOKENS', '400'))
+    max_concurrency = int(os.environ.get('AI_MAX_CONCURRENCY', '4'))
     system_prompt_file = os.environ.get('SYSTEM_PROMPT_FILE', '')
+    user_prompts_file = os.environ.get('USER_PROMPTS_FILE', '')
     
     print(f"AI Provider: {provider}")
     print(f"Model: {model}")
@@ -137,6 +342,10 @@ def main():
         print("Error: AI_PROVIDER not specified")
         sys.exit(1)
     
+    if provider not in SUPPORTED_PROVIDERS:
+        print(f"Error: Unsupported provider '{provider}'. Supported: {', '.join(SUPPORTED_PROVIDERS)}")
+        sys.exit(1)
+    
     if not api_key:
         print("Error: AI_API_KEY not specified")
         sys.exit(1)
@@ -145,30 +354,58 @@ def main():
         print("Error: SYSTEM_PROMPT_FILE not specified")
         sys.exit(1)
     
+    if max_tokens <= 0 or item_tokens <= 0 or max_output_tokens <= 0:
+        print("Error: AI_MAX_TOKENS, AI_BATCH_ITEM_TOKENS and AI_MAX_OUTPUT_TOKENS must be positive")
+        sys.exit(1)
+    
     # Load prompts
     system_prompt = load_system_prompt(system_prompt_file)
     if not system_prompt:
         print("Error: Failed to load system prompt")
         sys.exit(1)
     
+    print(f"System prompt length: {len(system_prompt)} chars")
+    
+    # Batch mode: marshal prompts from the file into batched calls run concurrently
+    if user_prompts_file:
+        user_prompts = load_user_prompts(user_prompts_file)
+        if not user_prompts:
+            print("Error: No user prompts provided")
+            sys.exit(1)
+        
+        batch_size = get_batch_size(item_tokens, max_output_tokens)
+        print(f"Running {len(user_prompts)} prompts in batches of up to {batch_size} with max concurrency {max_concurrency}")
+        responses = asyncio.run(main_async(provider, api_key, base_url, model, system_prompt, user_prompts, max_tokens, item_tokens, max_output_tokens, max_concurrency))
+        
+        failed = 0
+        for index, response in enumerate(responses):
+            if not response:
+                print(f"Error: AI inference failed for prompt {index}")
+                response = "AI inference failed. Please check your API configuration."
+                failed += 1
+            set_github_output(f'response_{index}', response)
+        
+        if failed:
+            sys.exit(1)
+        print("AI inference completed successfully")
+        return
+    
     user_prompt = load_user_prompt()
     if not user_prompt:
         print("Error: No user prompt provided")
         sys.exit(1)
     
-    print(f"System prompt length: {len(system_prompt)} chars")
     print(f"User prompt length: {len(user_prompt)} chars")
     
-    # Call appropriate API
-    response = None
+    # No point summarizing the crawl fallback message, answer without calling the API;
+    # CONTENT_AVAILABLE is set by the workflow from the crawl step output
+    if os.environ.get('CONTENT_AVAILABLE') == 'false' or is_unreachable_content(user_prompt):
+        print("Content could not be retrieved, skipping AI inference")
+        set_github_output('response', get_unreachable_response())
+        return
     
-    if provider == 'openai' or provider == 'custom':
-        response = call_openai_api(api_key, base_url, model, system_prompt, user_prompt, max_tokens)
-    elif provider == 'anthropic':
-        response = call_anthropic_api(api_key, model, system_prompt, user_prompt, max_tokens)
-    else:
-        print(f"Error: Unsupported provider '{provider}'. Supported: openai, anthropic, custom")
-        sys.exit(1)
+    # Call appropriate API
+    response = asyncio.run(run_single(provider, api_key, base_url, model, system_prompt, user_prompt, max_tokens))
     
     # Handle response
     if response:
@@ -182,4 +419,4 @@ def main():
         sys.exit(1)
 
 if __name__ == '__main__':
-    main()
\ No newline at end of file
+    main()
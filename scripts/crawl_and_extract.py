@@ -0,0 +1,44 @@
+#!/usr/bin/env python3
+"""
+Wait for Crawl4AI task completion and extract content for AI inference.
+This script runs wait_crawl and truncate_content in one process, passing the
+crawl result in memory instead of through a temp file and step output.
+"""
+
+import asyncio
+import os
+import sys
+from _gh_output import set_github_output
+from wait_crawl import wait_for_completion
+from truncate_content import ERROR_DESCRIPTION, build_fallback_content, extract_content, truncate_content
+
+def main():
+    """Main execution function"""
+    try:
+        task_data = None
+        submit_outcome = os.environ.get('CRAWL_SUBMIT_OUTCOME', '')
+        print(f"Crawl4AI submit outcome: {submit_outcome}")
+        
+        if submit_outcome == 'success':
+            task_data = asyncio.run(wait_for_completion())
+        else:
+            print("Warning: Crawl4AI submit step was not successful")
+        
+        # Extract and process content
+        content, content_available = extract_content(task_data or {})
+        truncated_content = truncate_content(content)
+        
+        # Set output for next step
+        set_github_output('content', truncated_content)
+        set_github_output('content_available', 'true' if content_available else 'false')
+        print("Successfully set content output for AI inference")
+        
+    except Exception as e:
+        print(f"Error: {e}")
+        # Set fallback content on error
+        set_github_output('content', build_fallback_content(ERROR_DESCRIPTION))
+        set_github_output('content_available', 'false')
+        sys.exit(0)  # Don't fail the workflow, continue with fallback
+
+if __name__ == '__main__':
+    main()
@@ -6,10 +6,19 @@ This script reads AI inference responses from temp files and posts them as issue
 
 import os
 import sys
-import subprocess
+import httpx
+
+# Set by GitHub Actions, points to the Enterprise Server API when running there
+GITHUB_API_URL = os.environ.get('GITHUB_API_URL', 'https://api.github.com')
+
+# Shared client for GitHub REST API requests
+_CLIENT = httpx.Client(timeout=30.0, headers={
+    'Accept': 'application/vnd.github+json',
+    'X-GitHub-Api-Version': '2022-11-28'
+})
 
 def post_comment(temp_file_path, issue_number):
-    """Post comment to GitHub issue using gh CLI with temp file"""
+    """Post comment to GitHub issue via the REST API with temp file"""
     
     try:
         # Check if temp file exists
@@ -18,21 +27,31 @@ def post_comment(temp_file_path, issue_number):
             return False
         
         # Check if GH_TOKEN is available
-        if not os.environ.get('GH_TOKEN'):
+        token = os.environ.get('GH_TOKEN')
+        if not token:
             print("Error: GH_TOKEN environment variable not set")
             return False
         
-        # Use gh CLI to post comment from file
-        cmd = ['gh', 'issue', 'comment', str(issue_number), '--body-file', temp_file_path]
+        repository = os.environ.get('GITHUB_REPOSITORY')
+        if not repository:
+            print("Error: GITHUB_REPOSITORY environment variable not set")
+            return False
+        
+        with open(temp_file_path, 'rb') as f:
+            body = f.read().decode('utf-8')
         
         print(f"Posting comment to issue #{issue_number}")
-        result = subprocess.run(cmd, capture_output=True, text=True)
+        response = _CLIENT.post(
+            f"{GITHUB_API_URL}/repos/{repository}/issues/{issue_number}/comments",
+            json={'body': body},
+            headers={'Authorization': f'Bearer {token}'}
+        )
         
-        if result.returncode == 0:
+        if response.status_code == 201:
             print("Comment posted successfully")
             return True
         else:
-            print(f"Error posting comment: {result.stderr}")
+            print(f"Error posting comment: HTTP {response.status_code}: {response.text}")
             return False
             
     except Exception as e:
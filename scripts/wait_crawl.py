@@ -1,15 +1,28 @@
 #!/usr/bin/env python3
 """
 Wait for Crawl4AI task completion with robust error handling.
-This script polls a Crawl4AI task until completion and sets GitHub Actions output.
+Used by crawl_and_extract.py to poll a Crawl4AI task until completion.
 """
 
-import json
-import os
+import asyncio
+import random
 import time
-import requests
+import httpx
+import orjson
 
-def wait_for_completion():
+CRAWL4AI_BASE_URL = 'http://localhost:11235'
+POLL_TIMEOUT = 60
+MAX_POLL_DELAY = 10
+
+# Polls are sequential, so a single pooled keep-alive connection avoids pool churn
+POLL_LIMITS = httpx.Limits(max_connections=1, max_keepalive_connections=1)
+
+def poll_delay(attempt):
+    """Exponential poll delay with jitter: 0.25s, 0.5s, 1s, ... capped at MAX_POLL_DELAY"""
+    delay = min(MAX_POLL_DELAY, 0.25 * (2 ** (attempt - 1)))
+    return delay + random.uniform(0, 0.1 * delay)
+
+async def wait_for_completion():
     """Wait for Crawl4AI task completion with robust error handling"""
     
     # Read raw response from temp file instead of environment variable
@@ -32,7 +45,7 @@ def wait_for_completion():
         return None
     
     try:
-        response_data = json.loads(raw_response)
+        response_data = orjson.loads(raw_response)
         
         # Debug: Show the response structure
         print(f"Response keys: {list(response_data.keys())}")
@@ -63,72 +76,44 @@ def wait_for_completion():
         
         print(f"Successfully extracted task_id: {task_id}")
         
-        # Poll for completion (max 60 seconds)
-        for attempt in range(1, 13):
-            try:
-                response = requests.get(f"http://localhost:11235/task/{task_id}", timeout=10)
-                
-                if response.status_code != 200:
-                    print(f"Attempt {attempt}: HTTP {response.status_code}")
-                    time.sleep(5)
-                    continue
-                
-                task_data = response.json()
-                status = task_data.get('status', 'unknown')
-                print(f"Attempt {attempt}: Task status: {status}")
-                
-                if status == 'completed':
-                    print("Task completed successfully")
-                    return task_data
-                elif status == 'failed':
-                    error_msg = task_data.get('error', 'No error details')
-                    print(f"Task failed: {error_msg}")
-                    return None
-                
-                time.sleep(5)
+        # Poll for completion (max 60 seconds), backing off from 0.25s up to 10s
+        deadline = time.monotonic() + POLL_TIMEOUT
+        attempt = 0
+        # Create the client inside the coroutine so it is bound to the running event loop
+        async with httpx.AsyncClient(timeout=10.0, limits=POLL_LIMITS) as client:
+            while time.monotonic() < deadline:
+                attempt += 1
+                try:
+                    response = await client.get(f"{CRAWL4AI_BASE_URL}/task/{task_id}")
+                    
+                    if response.status_code != 200:
+                        print(f"Attempt {attempt}: HTTP {response.status_code}")
+                    else:
+                        task_data = orjson.loads(response.content)
+                        status = task_data.get('status', 'unknown')
+                        print(f"Attempt {attempt}: Task status: {status}")
+                        
+                        if status == 'completed':
+                            print("Task completed successfully")
+                            return task_data
+                        elif status == 'failed':
+                            error_msg = task_data.get('error', 'No error details')
+                            print(f"Task failed: {error_msg}")
+                            return None
+                    
+                except httpx.HTTPError as e:
+                    print(f"Attempt {attempt}: Request failed: {e}")
+                except orjson.JSONDecodeError as e:
+                    print(f"Attempt {attempt}: Invalid JSON response: {e}")
                 
-            except requests.exceptions.RequestException as e:
-                print(f"Attempt {attempt}: Request failed: {e}")
-                time.sleep(5)
-                continue
-            except json.JSONDecodeError as e:
-                print(f"Attempt {attempt}: Invalid JSON response: {e}")
-                time.sleep(5)
-                continue
-        
-        print("Task timeout after 60 seconds")
+                await asyncio.sleep(min(poll_delay(attempt), max(0.0, deadline - time.monotonic())))
+            
+        print(f"Task timeout after {POLL_TIMEOUT} seconds")
         return None
         
-    except json.JSONDecodeError as e:
+    except orjson.JSONDecodeError as e:
         print(f"Error parsing crawl submit response: {e}")
         return None
     except Exception as e:
         print(f"Unexpected error: {e}")
         return None
-
-def set_github_output(name, value):
-    """Set GitHub Actions output"""
-    github_output = os.environ.get('GITHUB_OUTPUT')
-    if github_output:
-        with open(github_output, 'a', encoding='utf-8') as f:
-            delimiter = "RESPONSE_EOF"
-            f.write(f"{name}<<{delimiter}\n")
-            f.write(value)
-            f.write(f"\n{delimiter}\n")
-
-def main():
-    """Main execution function"""
-    try:
-        result = wait_for_completion()
-        if result:
-            set_github_output('response', json.dumps(result))
-            print("Successfully set response output")
-        else:
-            print("Failed to get valid response, continuing with empty result")
-            set_github_output('response', '{}')
-    except Exception as e:
-        print(f"Error in wait_for_completion: {e}")
-        set_github_output('response', '{}')
-
-if __name__ == '__main__':
-    main()
\ No newline at end of file